@@ -1,38 +1,87 @@
 # dify_client.py
 import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Iterator
 import requests
+from requests.adapters import HTTPAdapter
 
 # Get Dify API key from environment variable
 DIFY_API_KEY = os.getenv("DIFY_API_KEY")  # Make sure this is set in docker-compose or locally
 DIFY_API_URL = "https://api.dify.ai/v1/chat-messages"
 
-def ask_dify(question: str, user_id="user-1") -> str:
+# Shared session so chat turns reuse pooled connections instead of a new TLS handshake each time
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+# LRU cache of complete answers keyed on the normalized question; errors are never stored
+_ANSWER_CACHE_SIZE = 256
+_answer_cache: "OrderedDict[str, str]" = OrderedDict()
+_answer_cache_lock = threading.Lock()
+
+def _normalize(question: str) -> str:
+    """Collapse case and whitespace so trivially different questions share a cache entry"""
+    return " ".join(question.lower().split())
+
+def ask_dify(question: str, user_id="user-1") -> Iterator[str]:
     """
     Send a user question to the Annapurna (Dify) chatbot
-    and return the response as a string.
+    and yield the response in chunks as they are generated.
     """
     if not DIFY_API_KEY:
-        return "⚠️ Dify API key not configured. Please set DIFY_API_KEY."
+        yield "⚠️ Dify API key not configured. Please set DIFY_API_KEY."
+        return
+
+    cache_key = _normalize(question)
+    with _answer_cache_lock:
+        cached = _answer_cache.get(cache_key)
+        if cached is not None:
+            _answer_cache.move_to_end(cache_key)
+    if cached is not None:
+        yield cached
+        return
 
     headers = {"Authorization": f"Bearer {DIFY_API_KEY}"}
     payload = {
         "query": question,
         "inputs": {},           # Extra input fields if needed
-        "response_mode": "blocking",
+        "response_mode": "streaming",
         "conversation_id": None, # Keep None to start a new conversation
         "user": user_id
     }
 
     try:
-        response = requests.post(DIFY_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        with _SESSION.post(DIFY_API_URL, json=payload, headers=headers, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"  # SSE frames are UTF-8 but often sent without a charset
+            chunks = []
+
+            # Dify streams server-sent events: one "data: {...}" line per frame
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[len("data:"):])
+                except ValueError:
+                    continue
+
+                if event.get("event") in ("message", "agent_message") and event.get("answer"):
+                    chunks.append(event["answer"])
+                    yield event["answer"]
+                elif event.get("event") == "error":
+                    yield f"❌ Error from Annapurna: {event.get('message', 'unknown error')}"
+                    return
+
+            if not chunks:
+                yield "⚠️ No response from Annapurna. Try again."
+                return
 
-        # Return the chatbot's answer
-        if "answer" in data and data["answer"]:
-            return data["answer"]
-        else:
-            return "⚠️ No response from Annapurna. Try again."
+        with _answer_cache_lock:
+            _answer_cache[cache_key] = "".join(chunks)
+            _answer_cache.move_to_end(cache_key)
+            if len(_answer_cache) > _ANSWER_CACHE_SIZE:
+                _answer_cache.popitem(last=False)
 
     except requests.exceptions.RequestException as e:
-        return f"❌ Error connecting to Annapurna: {str(e)}"
+        yield f"❌ Error connecting to Annapurna: {str(e)}"
@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import json
+import orjson
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
+import threading
+from collections import defaultdict
 from dify_client import ask_dify
 from pathlib import Path
 
@@ -15,40 +17,158 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Custom CSS for better styling
+_CSS = """
+<style>
+.main-header {
+    text-align: center;
+    color: #FF6B35;
+    font-size: 3rem;
+    margin-bottom: 2rem;
+}
+.recipe-card {
+    border: 2px solid #e0e0e0;
+    border-radius: 10px;
+    padding: 1rem;
+    margin: 1rem 0;
+    background-color: #f9f9f9;
+}
+.favorite-btn {
+    background-color: #FF69B4;
+    color: white;
+    border: none;
+    padding: 0.5rem 1rem;
+    border-radius: 5px;
+    cursor: pointer;
+}
+.category-header {
+    color: #2E8B57;
+    font-size: 1.5rem;
+    margin: 1rem 0;
+}
+</style>
+"""
+
+@st.cache_data(show_spinner=False)
+def _read_json(path: Path, mtime: float):
+    """Read and parse a JSON file, cached until its modification time changes"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def _write_atomic(path: Path, data: bytes):
+    """Write bytes via a temporary file so a crash never leaves a half-written file"""
+    # Create the directory on demand, since the one-time bootstrap in __init__ can be outlived
+    path.parent.mkdir(exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        # Make sure the bytes are on disk before the rename, or a power loss can leave an empty file
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _searchable_text(recipe: Dict) -> str:
+    """Build the lowercased text matched against search queries"""
+    return (
+        recipe['name'] + ' ' + 
+        recipe['english_name'] + ' ' +
+        ' '.join(recipe['ingredients']) + ' ' +
+        recipe['description']
+    ).lower()
+
+def _flatten(categories: Dict) -> List[Dict]:
+    """Flatten categorised recipes into a list, tagging each with its category
+    and precomputed search text"""
+    return [
+        {**recipe, 'category': category, '_searchable': _searchable_text(recipe)}
+        for category, recipes in categories.items()
+        for recipe in recipes
+    ]
+
 class TeluguCulinaryApp:
     """Optimized Telugu Culinary Application with chatbot integration ready"""
     
+    # Set once the data directory has been created, so later instances skip the mkdir. Streamlit
+    # re-executes this script on every rerun, which redefines the class and resets the flag, so
+    # it only helps when the class is used outside Streamlit; in the app, get_app avoids the repeat
+    _DATA_BOOTSTRAPPED = False
+    
     def __init__(self):
         self.data_dir = Path("data")
-        self.data_dir.mkdir(exist_ok=True)
+        if not type(self)._DATA_BOOTSTRAPPED:
+            self.data_dir.mkdir(exist_ok=True)
+            type(self)._DATA_BOOTSTRAPPED = True
         self.recipes_file = self.data_dir / "recipes.json"
         self.favorites_file = self.data_dir / "favorites.json"
+        # One instance is shared by every session thread (see get_app), so mutations,
+        # saves and index rebuilds are serialized; re-entrant because saves rebuild indexes
+        self._lock = threading.RLock()
         self.load_data()
     
     def load_data(self):
         """Load recipes and favorites data with error handling"""
-        try:
-            with open(self.recipes_file, 'r', encoding='utf-8') as f:
-                self.recipes = json.load(f)
-        except FileNotFoundError:
-            self.recipes = self.get_default_recipes()
-            self.save_recipes()
+        with self._lock:
+            # Hashes of the last written contents, used to skip no-op saves
+            self._recipes_hash = None
+            self._favorites_hash = None
         
-        try:
-            with open(self.favorites_file, 'r', encoding='utf-8') as f:
-                self.favorites = json.load(f)
-        except FileNotFoundError:
-            self.favorites = []
+            try:
+                self.recipes = _read_json(self.recipes_file, self.recipes_file.stat().st_mtime)
+                self._recipes_hash = hash(orjson.dumps(self.recipes, option=orjson.OPT_INDENT_2))
+            except FileNotFoundError:
+                self.recipes = self.get_default_recipes()
+                self.save_recipes()
+        
+            try:
+                self.favorites = set(_read_json(self.favorites_file, self.favorites_file.stat().st_mtime))
+                self._favorites_hash = hash(orjson.dumps(sorted(self.favorites)))
+            except FileNotFoundError:
+                self.favorites = set()
+        
+            self.build_indexes()
     
     def save_recipes(self):
-        """Save recipes to JSON file"""
-        with open(self.recipes_file, 'w', encoding='utf-8') as f:
-            json.dump(self.recipes, f, ensure_ascii=False, indent=2)
+        """Save recipes to JSON file, skipping the write if nothing changed"""
+        with self._lock:
+            data = orjson.dumps(self.recipes, option=orjson.OPT_INDENT_2)
+            if hash(data) == self._recipes_hash:
+                return
+            _write_atomic(self.recipes_file, data)
+            self._recipes_hash = hash(data)
+            _read_json.clear()
+            self.build_indexes()
+    
+    def build_indexes(self):
+        """Build lookup indexes over the current recipes"""
+        with self._lock:
+            all_recipes = _flatten(self.recipes)
+            
+            # Inverted indexes map each character trigram of the search text, and each
+            # difficulty level, to the positions in all_recipes of the recipes that have it
+            trigrams = defaultdict(set)
+            by_difficulty = defaultdict(set)
+            positions_by_id = defaultdict(list)
+            for position, recipe in enumerate(all_recipes):
+                text = recipe['_searchable']
+                for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                    trigrams[trigram].add(position)
+                by_difficulty[recipe.get('difficulty')].add(position)
+                positions_by_id[recipe['id']].append(position)
+            
+            self._all_recipes = all_recipes
+            self._positions_by_id = positions_by_id
+            self._trigrams = trigrams
+            self._by_difficulty = by_difficulty
     
     def save_favorites(self):
-        """Save favorites to JSON file"""
-        with open(self.favorites_file, 'w', encoding='utf-8') as f:
-            json.dump(self.favorites, f, ensure_ascii=False, indent=2)
+        """Save favorites to JSON file, skipping the write if nothing changed"""
+        with self._lock:
+            data = orjson.dumps(sorted(self.favorites))
+            if hash(data) == self._favorites_hash:
+                return
+            _write_atomic(self.favorites_file, data)
+            self._favorites_hash = hash(data)
+            _read_json.clear()
     
     def get_default_recipes(self) -> Dict:
         """Return default Telugu recipes data"""
@@ -111,90 +231,92 @@ class TeluguCulinaryApp:
     
     def get_all_recipes(self) -> List[Dict]:
         """Get all recipes as a flat list"""
-        all_recipes = []
-        for category, recipes in self.recipes.items():
-            for recipe in recipes:
-                recipe['category'] = category
-                all_recipes.append(recipe)
-        return all_recipes
+        return self._all_recipes
     
-    def search_recipes(self, query: str) -> List[Dict]:
-        """Search recipes by name or ingredients"""
-        if not query:
-            return self.get_all_recipes()
-        
-        query_lower = query.lower()
-        matching_recipes = []
-        
-        for recipe in self.get_all_recipes():
-            # Search in name, english name, ingredients, and description
-            searchable_text = (
-                recipe['name'] + ' ' + 
-                recipe['english_name'] + ' ' +
-                ' '.join(recipe['ingredients']) + ' ' +
-                recipe['description']
-            ).lower()
+    def search_recipes(self, query: str, difficulty: Optional[str] = None) -> List[Dict]:
+        """Search recipes by name or ingredients, optionally limited to one difficulty level"""
+        with self._lock:
+            if not query and not difficulty:
+                return self.get_all_recipes()
             
-            if query_lower in searchable_text:
-                matching_recipes.append(recipe)
-        
-        return matching_recipes
+            if not query:
+                positions = self._by_difficulty.get(difficulty, set())
+                return [self._all_recipes[i] for i in sorted(positions)]
+            
+            query_lower = query.lower()
+            
+            if len(query_lower) < 3:
+                # Too short to contain a trigram, so scan instead; the cheap difficulty check goes first
+                return [
+                    r for r in self._all_recipes
+                    if (not difficulty or r.get('difficulty') == difficulty) and query_lower in r['_searchable']
+                ]
+            
+            # A recipe containing the query contains every trigram of it, so intersecting the
+            # postings (smallest first) narrows the candidates without ever dropping a match
+            postings = [
+                self._trigrams.get(query_lower[i:i + 3], set())
+                for i in range(len(query_lower) - 2)
+            ]
+            if difficulty:
+                postings.append(self._by_difficulty.get(difficulty, set()))
+            positions = set.intersection(*sorted(postings, key=len))
+            
+            # Confirm the full query as a substring, so results match a plain scan exactly
+            return [
+                recipe for recipe in (self._all_recipes[i] for i in sorted(positions))
+                if query_lower in recipe['_searchable']
+            ]
+    
+    def add_recipe(self, category: str, recipe: Dict):
+        """Add a recipe to a category and save"""
+        with self._lock:
+            self.recipes.setdefault(category, []).append(recipe)
+            self.save_recipes()
+    
+    def get_favorite_recipes(self) -> List[Dict]:
+        """Get favorite recipes by direct id lookup, in catalogue order"""
+        with self._lock:
+            positions = sorted(
+                position
+                for recipe_id in self.favorites
+                for position in self._positions_by_id.get(recipe_id, ())
+            )
+            return [self._all_recipes[i] for i in positions]
     
     def add_to_favorites(self, recipe_id: str):
         """Add recipe to favorites"""
-        if recipe_id not in self.favorites:
-            self.favorites.append(recipe_id)
-            self.save_favorites()
-            return True
-        return False
+        with self._lock:
+            if recipe_id not in self.favorites:
+                self.favorites.add(recipe_id)
+                self.save_favorites()
+                return True
+            return False
     
     def remove_from_favorites(self, recipe_id: str):
         """Remove recipe from favorites"""
-        if recipe_id in self.favorites:
-            self.favorites.remove(recipe_id)
-            self.save_favorites()
-            return True
-        return False
+        with self._lock:
+            if recipe_id in self.favorites:
+                self.favorites.remove(recipe_id)
+                self.save_favorites()
+                return True
+            return False
     
     def is_favorite(self, recipe_id: str) -> bool:
         """Check if recipe is in favorites"""
         return recipe_id in self.favorites
 
+@st.cache_resource
+def get_app() -> TeluguCulinaryApp:
+    """Return the shared app instance, created once and reused across reruns"""
+    return TeluguCulinaryApp()
+
 def main():
     """Main application function"""
-    app = TeluguCulinaryApp()
+    app = get_app()
     
-    # Custom CSS for better styling
-    st.markdown("""
-    <style>
-    .main-header {
-        text-align: center;
-        color: #FF6B35;
-        font-size: 3rem;
-        margin-bottom: 2rem;
-    }
-    .recipe-card {
-        border: 2px solid #e0e0e0;
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 1rem 0;
-        background-color: #f9f9f9;
-    }
-    .favorite-btn {
-        background-color: #FF69B4;
-        color: white;
-        border: none;
-        padding: 0.5rem 1rem;
-        border-radius: 5px;
-        cursor: pointer;
-    }
-    .category-header {
-        color: #2E8B57;
-        font-size: 1.5rem;
-        margin: 1rem 0;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Emitted on every run: Streamlit drops elements that a rerun does not redraw
+    st.markdown(_CSS, unsafe_allow_html=True)
     
     # Header
     st.markdown('<h1 class="main-header">🍛 తెలుగు వంటకాలు</h1>', unsafe_allow_html=True)
@@ -225,7 +347,7 @@ def show_home_page(app: TeluguCulinaryApp):
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Recipes", len(app.get_all_recipes()))
+        st.metric("Total Recipes", sum(len(recipes) for recipes in app.recipes.values()))
     with col2:
         st.metric("Categories", len(app.recipes.keys()))
     with col3:
@@ -260,12 +382,11 @@ def show_search_page(app: TeluguCulinaryApp):
             ["All", "సులభం", "మధ్యమం", "కష్టం"]
         )
     
-    # Search results
-    recipes = app.search_recipes(search_query)
-    
-    # Apply difficulty filter
-    if difficulty_filter != "All":
-        recipes = [r for r in recipes if r.get('difficulty') == difficulty_filter]
+    # Search results, with the difficulty filter applied in the same pass
+    recipes = app.search_recipes(
+        search_query,
+        difficulty=None if difficulty_filter == "All" else difficulty_filter
+    )
     
     st.subheader(f"Found {len(recipes)} recipes")
     
@@ -283,12 +404,7 @@ def show_favorites_page(app: TeluguCulinaryApp):
         st.info("No favorite recipes yet! Start adding some from the search page.")
         return
     
-    favorite_recipes = [
-        recipe for recipe in app.get_all_recipes() 
-        if recipe['id'] in app.favorites
-    ]
-    
-    for recipe in favorite_recipes:
+    for recipe in app.get_favorite_recipes():
         display_recipe_card(app, recipe, show_remove_favorite=True)
 
 def show_add_recipe_page(app: TeluguCulinaryApp):
@@ -338,10 +454,7 @@ def show_add_recipe_page(app: TeluguCulinaryApp):
                 }
                 
                 # Add to appropriate category
-                if category not in app.recipes:
-                    app.recipes[category] = []
-                app.recipes[category].append(new_recipe)
-                app.save_recipes()
+                app.add_recipe(category, new_recipe)
                 
                 st.success("Recipe added successfully! 🎉")
             else:
@@ -369,13 +482,9 @@ def show_chatbot_page():
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Get response from Dify chatbot
-        from dify_client import ask_dify
-        response = ask_dify(prompt)
-
-        # Display chatbot response
+        # Stream the Dify chatbot response as it is generated
         with st.chat_message("assistant"):
-            st.markdown(response)
+            response = st.write_stream(ask_dify(prompt))
         st.session_state.messages.append({"role": "assistant", "content": response})
 
 
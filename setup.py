@@ -9,16 +9,15 @@ import sys
 import os
 from pathlib import Path
 
-def run_command(command, description):
-    """Run a command and handle errors"""
+def run_command(argv: list, description):
+    """Run a command, streaming its output to the console, and handle errors"""
     print(f"🔄 {description}...")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        subprocess.run(argv, check=True)
         print(f"✅ {description} completed successfully")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"❌ Error in {description}: {e}")
-        print(f"Error output: {e.stderr}")
         return False
 
 def check_python_version():
@@ -44,12 +43,12 @@ def create_project_structure():
 
 def install_requirements():
     """Install required packages"""
-    if not run_command("pip install -r requirements.txt", "Installing requirements"):
-        # Fallback installation
-        packages = ["streamlit>=1.28.0", "pandas>=1.5.0"]
-        for package in packages:
-            if not run_command(f"pip install {package}", f"Installing {package}"):
-                return False
+    pip_install = [sys.executable, "-m", "pip", "install", "--no-input", "--disable-pip-version-check"]
+    if not run_command(pip_install + ["-r", "requirements.txt"], "Installing requirements"):
+        # Fallback installation, resolved in a single pip run
+        packages = ["streamlit>=1.31.0", "pandas>=1.5.0", "orjson>=3.9.0"]
+        if not run_command(pip_install + packages, "Installing fallback packages"):
+            return False
     return True
 
 def create_run_script():